@@ -14,16 +14,33 @@ from backend.src.graph.state import VideoAuditState,ComplianceIssue
 
 #import service
 from backend.src.service.video_indexer import VideoIndexerService
+from backend.src.service.fingerprint_index import FingerprintIndex
 
 # Configure the logger
 logger = logging.getLogger("brand-gardian")
 logging.basicConfig(level=logging.INFO)
 
 
+# fields of a finished audit that are reused for a duplicate video
+AUDIT_FIELDS = [
+    "video_id", "transcript", "ocr_text", "video_metadata",
+    "compliance_results", "audit_statuses", "audit_summaries", "final_status", "final_report"
+]
+
+def _reuse_audit(audit : Dict[str,Any]) -> Dict[str,Any]:
+    logger.info(f"------[NODE: Indexer] Duplicate ad, reusing audit of {audit.get('video_id')}")
+    reused = {
+        key : audit[key] for key in AUDIT_FIELDS
+        if key != "video_id" and audit.get(key) is not None
+    }
+    reused["duplicate_of"] = audit.get("video_id")
+    return reused
+
 # NODE 1 : Indexer
 # Function resposible for convert video to text
 def index_video_node(state : VideoAuditState) -> Dict[str,Any]:
     '''
+        Fingerprint the youtube video and reuse a prior audit if it is a duplicate
         Download the youtube video from the url
         Upload to the Azure Video Indexer
         extract the insights
@@ -36,12 +53,44 @@ def index_video_node(state : VideoAuditState) -> Dict[str,Any]:
 
     try:
         vi_service = VideoIndexerService()
-        #download
-        if "youtube.com" in video_url or "youtube.be" in video_url or "youtu.be" in video_url:
-            local_path=vi_service.download_youtube_video(video_url,output_path=local_filename)
-        else:
+        if not ("youtube.com" in video_url or "youtube.be" in video_url or "youtu.be" in video_url):
             raise Exception("Please provide a valid youtube URL for this test.")
 
+        # duplicate detection is best effort, any failure falls back to a full audit
+        fp_index, fingerprint, info = None, None, None
+        try:
+            fp_index = FingerprintIndex()
+            # same video id, before any download
+            info = vi_service.get_youtube_metadata(video_url,output_path=local_filename)
+            fingerprint = fp_index.build_fingerprint(info)
+            prior_audit = fp_index.find_match(fingerprint)
+            if prior_audit:
+                return _reuse_audit(prior_audit)
+        except Exception as e:
+            logger.warning(f"Duplicate lookup failed, continuing with a full audit : {e}")
+            fingerprint = None
+
+        #download (reuses the extracted info, no second extraction)
+        local_path=vi_service.download_youtube_video(video_url,output_path=local_filename,info=info)
+
+        # keyframe + audio fingerprint, catches re-uploads and mirrors under another URL
+        if fingerprint and fp_index.ffmpeg_available():
+            try:
+                fingerprint["frame_hashes"] = fp_index.frame_hashes(local_path, fingerprint["duration"])
+                fingerprint["audio_envelope"] = fp_index.audio_envelope(local_path)
+                prior_audit = fp_index.find_match(fingerprint)
+                if prior_audit:
+                    if os.path.exists(local_path):
+                        os.remove(local_path)
+                    # record the mirror under its own id, later sweeps skip the download
+                    try:
+                        fp_index.add(fingerprint, prior_audit)
+                    except Exception as e:
+                        logger.error(f"Failed to record fingerprint : {e}")
+                    return _reuse_audit(prior_audit)
+            except Exception as e:
+                logger.warning(f"Content fingerprint failed, continuing with a full audit : {e}")
+
         #upload
         azure_video_id = vi_service.upload_video(local_path, video_name=video_id_input)
         logger.info(f"Upload success. Azure ID : {azure_video_id}")
@@ -55,6 +104,7 @@ def index_video_node(state : VideoAuditState) -> Dict[str,Any]:
 
         # extract
         clean_data = vi_service.extract_data(raw_insights)
+        clean_data["fingerprint"] = fingerprint
         logger.info(f"------[NODE: Indexer] Extraction completed ---------")
         return clean_data
     except Exception as e:
@@ -66,57 +116,51 @@ def index_video_node(state : VideoAuditState) -> Dict[str,Any]:
             "ocr_text":[]
         }
 
-# NODE 2 : Compliance Auditor
-def audit_content_node(state:VideoAuditState) -> Dict[str,Any]:
-    '''
-    Perform Retrival Augumented Generation to audit the content - brand video
-    '''
-    logger.info(f"-----[Node: Auditor] quering the knowledge base & LLM")
-    transcript = state.get("transcript","")
-    logger.info(f"=======>>>> Here is the transcripts :{repr(transcript)}")
-    if not transcript:
-        logger.warning(f"No transcript available. Skipping audit....")
-        return {
-            "final_state" : "FAIL",
-            "final_report" : "Audit Skipped because video proccessing failed (No transcript.)"
-        }
-
-    # initialise the azure services
-    llm = AzureChatOpenAI(
+# Helpers shared by the audit branches
+def _get_llm():
+    return AzureChatOpenAI(
         azure_deployment = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT"),
         openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION"),
         temperature = 0.0
     )
 
+def _get_vector_store():
     embeddings = AzureOpenAIEmbeddings(
         azure_deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
         openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION"),
     )
 
-    vector_store = AzureSearch(
+    return AzureSearch(
         azure_search_endpoint = os.getenv("AZURE_SEARCH_ENDPOINT"),
         azure_search_key = os.getenv("AZURE_SEARCH_API_KEY"),
         index_name = os.getenv("AZURE_SEARCH_INDEX_NAME"),
         embedding_function = embeddings.embed_query
     )
 
-    # RAG Retrival 
-    ocr_text = state.get("ocr_text",[])
-    query_text = f"{transcript} {''.join(ocr_text)}"
-    docs = vector_store.similarity_search(query_text,k=3)
-    retrieved_rules = "\n\n".join([doc.page_content for doc in docs])
-    
-    # System prompt
-    system_prompt = f"""
+def _audit_sources(state:VideoAuditState) -> Dict[str,str]:
+    '''
+    The text of every source a branch can audit, keyed by source name
+    '''
+    return {
+        "Transcript" : state.get("transcript") or "",
+        "On-screen text (OCR)" : " ".join(state.get("ocr_text") or []),
+        "Video metadata" : json.dumps(state.get("video_metadata")) if state.get("video_metadata") else ""
+    }
+
+def _build_system_prompt(source : str, retrieved_rules : str) -> str:
+    return f"""
     You are a Senior Brand Compliance Auditor.
     
     OFFICIAL REGULATORY RULES:
     {retrieved_rules}
     
     INSTRUCTIONS:
-    1. Analyze the Transcript and OCR text below.
-    2. Identify ANY violations of the rules.
-    3. Return strictly JSON in the following format:
+    1. Analyze ONLY the {source} below.
+    2. The OTHER SOURCES of the same video are read-only context. A requirement met there
+       (e.g. an on-screen disclosure for a spoken claim) is NOT a violation of the {source}.
+       Do not report violations that belong to the other sources.
+    3. Identify ANY violations of the rules in the {source}.
+    4. Return strictly JSON in the following format:
     
     {{
         "compliance_results": [
@@ -133,33 +177,146 @@ def audit_content_node(state:VideoAuditState) -> Dict[str,Any]:
     If no violations are found, set "status" to "PASS" and "compliance_results" to [].
     """
 
+def _run_audit(source : str, state : VideoAuditState) -> Dict[str,Any]:
+    '''
+    Retrieve the rules relevant to one source (transcript / OCR / metadata)
+    and ask the LLM to audit only that source against them,
+    with the other sources of the video as context.
+    Returns only reducer keys so the branches can run in parallel.
+    '''
+    sources = _audit_sources(state)
+    content = sources[source]
+    other_sources = "\n".join(
+        f"{name.upper()} : {text}" for name, text in sources.items()
+        if name != source and text
+    )
+
     user_message = f"""
-                    VIDEO_METADATA : {state.get('video_metadata',{})}
-                    TRANSCRIPT : {transcript}
-                    ON-SCREEN TEXT (OCR) : {ocr_text}
+                    {source.upper()} : {content}
+
+                    OTHER SOURCES (context only) :
+                    {other_sources or "None"}
                     """
-    
+
     try:
+        # RAG Retrival
+        vector_store = _get_vector_store()
+        docs = vector_store.similarity_search(content,k=3)
+        retrieved_rules = "\n\n".join([doc.page_content for doc in docs])
+
+        llm = _get_llm()
         response = llm.invoke([
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=_build_system_prompt(source, retrieved_rules)),
             HumanMessage(content=user_message)
         ])
         content =  response.content
-        logger.info(f"========>>> content : {content}")
+        logger.info(f"========>>> [{source}] content : {content}")
         if "```" in content:
-            content = re.search(r"```(?:json)?(.?)```",content,re.DOTALL).group(1)
+            content = re.search(r"```(?:json)?(.*?)```",content,re.DOTALL).group(1)
 
         audit_data = json.loads(content.strip())
         return {
-            "compliance_result" : audit_data.get("compliance_results",[]),
-            "final_status" : audit_data.get("status","FAIL"),
-            "final_report" : audit_data.get("final_report","No report generated")
+            "compliance_results" : audit_data.get("compliance_results",[]),
+            "audit_statuses" : [str(audit_data.get("status","FAIL")).strip().upper()],
+            "audit_summaries" : [f"[{source}] {audit_data.get('final_report','No report generated')}"]
         }
     except Exception as e:
-        logger.error(f"System Error in Auditor Node : {str(e)}")
+        logger.error(f"System Error in Auditor Node ({source}) : {str(e)}")
         # logging the raw response 
         logger.error(f"Raw LLM response : {response.content if 'response' in locals() else None}")
         return {
-            "errors" : [str(e)],
-            "final_status" : "FAIL"
-        }
\ No newline at end of file
+            "errors" : [f"{source} audit failed : {str(e)}"]
+        }
+
+# NODE 2a : Transcript Auditor
+def audit_transcript_node(state:VideoAuditState) -> Dict[str,Any]:
+    '''
+    Audit the speech-to-text transcript against the retrieved rules
+    '''
+    logger.info(f"-----[Node: Transcript Auditor] quering the knowledge base & LLM")
+    transcript = state.get("transcript","")
+    logger.info(f"=======>>>> Here is the transcripts :{repr(transcript)}")
+    if not transcript:
+        logger.warning(f"No transcript available. Skipping transcript audit....")
+        return {}
+    return _run_audit("Transcript", state)
+
+# NODE 2b : OCR Auditor
+def audit_ocr_node(state:VideoAuditState) -> Dict[str,Any]:
+    '''
+    Audit the on-screen text (OCR) against the retrieved rules
+    '''
+    logger.info(f"-----[Node: OCR Auditor] quering the knowledge base & LLM")
+    ocr_text = state.get("ocr_text",[])
+    if not ocr_text:
+        logger.warning(f"No on-screen text available. Skipping OCR audit....")
+        return {}
+    return _run_audit("On-screen text (OCR)", state)
+
+# NODE 2c : Metadata Auditor
+def audit_metadata_node(state:VideoAuditState) -> Dict[str,Any]:
+    '''
+    Audit the video metadata (duration, platform) against the ad specs
+    '''
+    logger.info(f"-----[Node: Metadata Auditor] quering the knowledge base & LLM")
+    video_metadata = state.get("video_metadata",{})
+    if not video_metadata:
+        logger.warning(f"No video metadata available. Skipping metadata audit....")
+        return {}
+    return _run_audit("Video metadata", state)
+
+def indexer_failed(state:VideoAuditState) -> bool:
+    '''
+    True when the indexer extracted nothing that the audit branches could check
+    '''
+    return not (state.get("transcript") or state.get("ocr_text") or state.get("video_metadata"))
+
+# NODE 3 : Join
+def finalize_audit_node(state:VideoAuditState) -> Dict[str,Any]:
+    '''
+    Join the parallel audit branches into the final status and report
+    '''
+    logger.info(f"-----[Node: Finalizer] merging the audit branches")
+    if indexer_failed(state):
+        return {
+            "final_status" : "FAIL",
+            "final_report" : "Audit Skipped because video proccessing failed (No extracted data.)"
+        }
+
+    # FAIL if any branch judged FAIL or errored, or if no branch ran at all
+    statuses = state.get("audit_statuses",[])
+    errors = state.get("errors",[])
+    final_status = "FAIL" if errors or not statuses or "FAIL" in statuses else "PASS"
+
+    summaries = state.get("audit_summaries",[])
+    final_report = "\n".join(summaries) if summaries else "No report generated"
+    if errors:
+        final_report += "\n\nErrors :\n" + "\n".join(errors)
+
+    return {
+        "final_status" : final_status,
+        "final_report" : final_report
+    }
+
+# NODE 4 : Fingerprint Recorder
+def record_fingerprint_node(state:VideoAuditState) -> Dict[str,Any]:
+    '''
+    Store the finished audit under the video fingerprint so that
+    re-uploads and mirrors of the same ad can reuse it
+    '''
+    fingerprint = state.get("fingerprint")
+    if not fingerprint or state.get("errors"):
+        logger.info(f"-----[Node: Recorder] No fingerprint or audit has errors. Not recording....")
+        return {}
+
+    # a skipped audit must never be reused for later uploads
+    if not state.get("audit_statuses"):
+        logger.info(f"-----[Node: Recorder] No audit branch ran. Not recording....")
+        return {}
+
+    try:
+        FingerprintIndex().add(fingerprint, {key : state.get(key) for key in AUDIT_FIELDS})
+        logger.info(f"-----[Node: Recorder] Audit recorded for {state.get('video_id')}")
+    except Exception as e:
+        logger.error(f"Failed to record fingerprint : {e}")
+    return {}
@@ -30,9 +30,16 @@ class VideoAuditState(TypedDict):
     transcript : Optional[str]  # Full extracted speech-to-text
     ocr_text : List[str]
 
+    # duplicate detection
+    fingerprint : Dict[str,Any] # {'source_id':..., 'title':..., 'duration':..., 'frame_hashes':[...], 'audio_envelope':[...]}
+    duplicate_of : Optional[str] # video_id of the audit reused for this video
+
     # analysis the output
     # store the list of all violations found by AI
     compliance_results : Annotated[List[ComplianceIssue], operator.add]
+    # per-branch verdicts and summaries, merged by the finalizer
+    audit_statuses : Annotated[List[str], operator.add] # PASS | FAIL
+    audit_summaries : Annotated[List[str], operator.add]
 
     # final deliverables
     final_status : str # PASS | FAIL
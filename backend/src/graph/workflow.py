@@ -2,16 +2,39 @@
 This module defines the DAG : Directed Acyclic Graph that orchestrates the video compliance
 audit process.
 it connects the nodes using the StateGraph from LangGraph
-START -> index_video_node -> audit_content_node -> END
+                             -> audit_transcript_node ->
+START -> index_video_node -> audit_ocr_node        -> finalize_audit_node -> record_fingerprint_node -> END
+                             -> audit_metadata_node   ->
+The audit branches run in parallel, their results are merged by the state reducers.
+A duplicate of an already audited ad goes from index_video_node straight to END,
+a failed indexing goes straight to finalize_audit_node.
 '''
 
 from langgraph.graph import StateGraph, END
 from backend.src.graph.state import VideoAuditState
 from backend.src.graph.nodes import (
     index_video_node, 
-    audit_content_node
+    audit_transcript_node,
+    audit_ocr_node,
+    audit_metadata_node,
+    finalize_audit_node,
+    record_fingerprint_node,
+    indexer_failed
 )
 
+AUDIT_BRANCHES = ["transcript_auditor","ocr_auditor","metadata_auditor"]
+
+def route_after_indexer(state : VideoAuditState):
+    '''
+    Skip the audit when the indexer reused the result of a duplicate ad,
+    skip the branches when there is nothing extracted to audit
+    '''
+    if state.get("duplicate_of"):
+        return END
+    if indexer_failed(state):
+        return "finalizer"
+    return AUDIT_BRANCHES
+
 def create_graph():
     '''
     Construct and compiles the langgraph workflow
@@ -23,16 +46,25 @@ def create_graph():
     
     #Add nodes
     workflow.add_node("indexer",index_video_node)
-    workflow.add_node("auditor",audit_content_node)
+    workflow.add_node("transcript_auditor",audit_transcript_node)
+    workflow.add_node("ocr_auditor",audit_ocr_node)
+    workflow.add_node("metadata_auditor",audit_metadata_node)
+    workflow.add_node("finalizer",finalize_audit_node)
+    workflow.add_node("recorder",record_fingerprint_node)
 
     # define the entry point : indexer
     workflow.set_entry_point("indexer")
 
-    # define the edges
-    workflow.add_edge("indexer","auditor")
+    # fan out : every audit branch starts once the indexer is done,
+    # unless the video is a duplicate of an already audited ad or indexing failed
+    workflow.add_conditional_edges("indexer",route_after_indexer,AUDIT_BRANCHES + ["finalizer",END])
 
-    # Once the audit is complete, the workflow ends
-    workflow.add_edge("auditor",END)
+    # fan in : the finalizer waits for all the branches
+    workflow.add_edge(AUDIT_BRANCHES,"finalizer")
+
+    # store the audit for duplicate detection, then the workflow ends
+    workflow.add_edge("finalizer","recorder")
+    workflow.add_edge("recorder",END)
 
     # Compile the graph
     app = workflow.compile()
@@ -41,5 +73,3 @@ def create_graph():
 # expose this runnable app
 
 app = create_graph()
-
-
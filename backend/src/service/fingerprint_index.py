@@ -0,0 +1,259 @@
+'''
+Local fingerprint index : detects re-uploads and mirrors of an already audited ad
+so the workflow can reuse the previous result instead of indexing it again.
+
+An audit is only reused on a content level match : the same youtube video id,
+or a mirror whose keyframes (dHash of frames sampled with ffmpeg) AND audio
+(loudness envelope decoded with ffmpeg) both match. A new voice-over or a re-cut
+changes the audio, so it gets a fresh audit. An edit that only adds or removes
+a small on-screen overlay (e.g. an "#ad" label) is NOT caught by the keyframes,
+set DUPLICATE_MIRROR_REUSE=false to only log mirror hits and reuse the same video id.
+Title and duration only pick the candidates that get compared.
+
+Mirror detection needs the ffmpeg binary on the PATH, without it only
+the same youtube video id is reused.
+'''
+
+import os
+import re
+import json
+import shutil
+import logging
+import subprocess
+import tempfile
+from array import array
+from difflib import SequenceMatcher
+
+try:
+    import fcntl
+except ImportError:  # windows : no cross-process lock, writes are still atomic
+    fcntl = None
+
+
+logger = logging.getLogger("fingerprint-index")
+
+# frames sampled at these fractions of the duration
+FRAME_POSITIONS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+# audio is decoded to mono 8kHz, loudness is measured over 0.25s windows
+AUDIO_SAMPLE_RATE = 8000
+AUDIO_WINDOW = AUDIO_SAMPLE_RATE // 4
+
+class FingerprintIndex:
+    _ffmpeg_warned = False
+
+    def __init__(self):
+        self.index_path = os.getenv("FINGERPRINT_INDEX_PATH","fingerprint_index.json")
+        self.enabled = os.getenv("DUPLICATE_DETECTION_ENABLED","true").lower() == "true"
+        self.mirror_reuse = os.getenv("DUPLICATE_MIRROR_REUSE","true").lower() == "true"
+        self.max_hash_distance = float(os.getenv("DUPLICATE_MAX_HASH_DISTANCE","4"))
+        self.max_audio_distance = float(os.getenv("DUPLICATE_MAX_AUDIO_DISTANCE","0.05"))
+        self.duration_tolerance = float(os.getenv("DUPLICATE_DURATION_TOLERANCE","1.0"))
+        self.title_threshold = float(os.getenv("DUPLICATE_TITLE_THRESHOLD","0.5"))
+        # audits done against another version of the rules are never reused
+        self.rules_version = os.getenv("AUDIT_RULES_VERSION", os.getenv("AZURE_SEARCH_INDEX_NAME",""))
+        self.records = self._load()
+
+    def _load(self):
+        '''
+        A corrupt index raises instead of being treated as empty,
+        so it is never overwritten by the next add
+        '''
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path,'r') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError as e:
+                raise Exception(f"Fingerprint index {self.index_path} is corrupt : {e}")
+
+    def _save(self):
+        # write to a temp file and swap it in, a crash never leaves half a file
+        index_dir = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd,'w') as f:
+                json.dump(self.records, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def normalize_title(title):
+        '''
+        lowercase the title and drop punctuation / repeated spaces
+        '''
+        title = re.sub(r"[^\w\s]"," ",(title or "").lower())
+        return " ".join(title.split())
+
+    @classmethod
+    def ffmpeg_available(cls):
+        '''
+        mirror detection needs ffmpeg, warn once when it is missing
+        '''
+        if shutil.which("ffmpeg"):
+            return True
+        if not cls._ffmpeg_warned:
+            logger.warning("ffmpeg not found on PATH : mirror detection disabled, only the same video id is reused")
+            cls._ffmpeg_warned = True
+        return False
+
+    @staticmethod
+    def frame_hashes(file_path, duration):
+        '''
+        Perceptual fingerprint : 64 bit dHash of keyframes sampled with ffmpeg.
+        Survives the re-encoding youtube does on every upload.
+        '''
+        if not duration:
+            return None
+
+        hashes = []
+        for position in FRAME_POSITIONS:
+            result = subprocess.run(
+                [
+                    "ffmpeg", "-loglevel", "error",
+                    "-ss", str(duration * position), "-i", file_path,
+                    "-frames:v", "1", "-vf", "scale=9:8,format=gray",
+                    "-f", "rawvideo", "-"
+                ],
+                capture_output=True, check=True, timeout=30
+            )
+            pixels = result.stdout
+            if len(pixels) != 72:
+                raise Exception(f"Unexpected frame size from ffmpeg : {len(pixels)} bytes")
+
+            # each bit : is the pixel brighter than its right neighbour
+            bits = 0
+            for row in range(8):
+                for col in range(8):
+                    bits = (bits << 1) | int(pixels[row*9 + col] > pixels[row*9 + col + 1])
+            hashes.append(f"{bits:016x}")
+        return hashes
+
+    @staticmethod
+    def audio_envelope(file_path):
+        '''
+        Audio fingerprint : loudness of every 0.25s window, scaled 0-100 to the loudest one.
+        A new voice-over or a re-cut changes the loudness envelope.
+        '''
+        result = subprocess.run(
+            [
+                "ffmpeg", "-loglevel", "error", "-i", file_path,
+                "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+                "-f", "s16le", "-"
+            ],
+            capture_output=True, check=True, timeout=120
+        )
+        samples = array('h')
+        samples.frombytes(result.stdout[:len(result.stdout) - len(result.stdout) % 2])
+
+        energies = []
+        for start in range(0, len(samples) - AUDIO_WINDOW + 1, AUDIO_WINDOW):
+            window = samples[start:start + AUDIO_WINDOW]
+            energies.append(sum(abs(x) for x in window) / AUDIO_WINDOW)
+        loudest = max(energies, default=0)
+        if not loudest:
+            return None
+        return [round(100 * e / loudest) for e in energies]
+
+    def build_fingerprint(self, info):
+        '''
+        Build the fingerprint from the yt-dlp metadata,
+        frame_hashes and audio_envelope are added once the video is downloaded
+        '''
+        return {
+            "source_id" : info.get("id"),
+            "title" : self.normalize_title(info.get("title")),
+            "duration" : info.get("duration"),
+            "frame_hashes" : None,
+            "audio_envelope" : None
+        }
+
+    def is_candidate(self, fp, other):
+        '''
+        Cheap metadata filter (duration and title), never enough on its own to reuse an audit
+        '''
+        if fp.get("duration") is None or other.get("duration") is None:
+            return False
+        if abs(fp["duration"] - other["duration"]) > self.duration_tolerance:
+            return False
+        return SequenceMatcher(None, fp.get("title") or "", other.get("title") or "").ratio() >= self.title_threshold
+
+    @staticmethod
+    def hash_distance(hashes, other_hashes):
+        '''
+        mean hamming distance between the keyframe hashes
+        '''
+        distances = [
+            bin(int(a,16) ^ int(b,16)).count("1")
+            for a, b in zip(hashes, other_hashes)
+        ]
+        return sum(distances) / len(distances)
+
+    @staticmethod
+    def audio_distance(envelope, other_envelope):
+        '''
+        mean loudness difference (0-1), windows missing on one side count as fully different
+        '''
+        length = max(len(envelope), len(other_envelope))
+        difference = sum(abs(a - b) for a, b in zip(envelope, other_envelope))
+        difference += 100 * abs(len(envelope) - len(other_envelope))
+        return difference / (100 * length)
+
+    def is_match(self, fp, other):
+        if fp.get("source_id") and fp.get("source_id") == other.get("source_id"):
+            return True
+        if not self.is_candidate(fp, other):
+            return False
+
+        # the picture and the sound must both match
+        if not (fp.get("frame_hashes") and other.get("frame_hashes")):
+            return False
+        if len(fp["frame_hashes"]) != len(other["frame_hashes"]):
+            return False
+        if self.hash_distance(fp["frame_hashes"], other["frame_hashes"]) > self.max_hash_distance:
+            return False
+        if not (fp.get("audio_envelope") and other.get("audio_envelope")):
+            return False
+        if self.audio_distance(fp["audio_envelope"], other["audio_envelope"]) > self.max_audio_distance:
+            return False
+
+        if not self.mirror_reuse:
+            logger.info(f"Mirror of {other.get('source_id')} found, not reused (DUPLICATE_MIRROR_REUSE=false)")
+            return False
+        return True
+
+    def find_match(self, fp):
+        '''
+        Returns the newest stored audit that matches the fingerprint
+        and was done against the current rules
+        '''
+        if not self.enabled:
+            logger.info("Duplicate detection disabled, forcing a new audit")
+            return None
+
+        for record in reversed(self.records):
+            if record.get("rules_version") != self.rules_version:
+                continue
+            if self.is_match(fp, record["fingerprint"]):
+                logger.info(f"Duplicate of {record['audit'].get('video_id')}")
+                return record["audit"]
+        return None
+
+    def add(self, fp, audit):
+        '''
+        Re-read the index under a lock before appending,
+        so concurrent audits don't drop each other's records
+        '''
+        with open(self.index_path + ".lock",'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.records = self._load()
+            self.records.append({
+                "fingerprint" : fp,
+                "audit" : audit,
+                "rules_version" : self.rules_version
+            })
+            self._save()
@@ -51,13 +51,8 @@ class VideoIndexerService:
         
         return reponse.json().get("accessToken")
     
-    def download_youtube_video(seld,url,output_path="temp_video.mp4"):
-        '''
-        downloads the youtube video to local file
-        '''
-        logger.info(f"Downloading Youtube video : {url}")
-        
-        ydl_opts = {
+    def youtube_dl_options(self,output_path="temp_video.mp4"):
+        return {
             'format': 'best',
             'outtmpl': output_path, # output template
             'quiet': False,
@@ -68,9 +63,30 @@ class VideoIndexerService:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
             }
 
+    def get_youtube_metadata(self,url,output_path="temp_video.mp4"):
+        '''
+        extracts the youtube metadata (id, title, duration) without downloading,
+        pass the result to download_youtube_video to avoid a second extraction
+        '''
+        try:
+            with yt_dlp.YoutubeDL(self.youtube_dl_options(output_path)) as ydl:
+                return ydl.extract_info(url, download=False)
+        except Exception as e:
+            raise Exception(f"Youtube Metadata Fetch Failed : {str(e)}")
+
+    def download_youtube_video(self,url,output_path="temp_video.mp4",info=None):
+        '''
+        downloads the youtube video to local file,
+        reuses the info from get_youtube_metadata when given
+        '''
+        logger.info(f"Downloading Youtube video : {url}")
+
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with yt_dlp.YoutubeDL(self.youtube_dl_options(output_path)) as ydl:
+                if info:
+                    ydl.process_ie_result(info, download=True)
+                else:
+                    ydl.download([url])
             logger.info(f"Downloaded Completed")
             return output_path
         except Exception as e:
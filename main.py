@@ -62,8 +62,12 @@ def run_cli_simulation():
         "video_id": f"vid_{session_id[:8]}",
         
         # Empty list that will store compliance violations found
-        # Will be populated by the Auditor node
+        # Will be populated by the parallel Auditor nodes
         "compliance_results": [],
+
+        # Per-branch verdicts and summaries merged into the final report
+        "audit_statuses": [],
+        "audit_summaries": [],
         
         # Empty list for any errors during processing
         # Example: ["Download failed", "Transcript unavailable"]
@@ -80,7 +84,7 @@ def run_cli_simulation():
     # This is where the magic happens - runs the entire workflow
     try:
         # app.invoke() triggers the LangGraph workflow
-        # It passes through: START → Indexer → Auditor → END
+        # It passes through: START → Indexer → Auditors (parallel) → Finalizer → END
         # Returns the final state with all results
         final_state = app.invoke(initial_inputs)
         
@@ -98,6 +102,10 @@ def run_cli_simulation():
         
         # Shows PASS or FAIL status
         print(f"Status:      {final_state.get('final_status')}")
+
+        # Set when the video is a re-upload / mirror of an already audited ad
+        if final_state.get('duplicate_of'):
+            print(f"Reused:      audit of {final_state.get('duplicate_of')}")
         
         # ========== VIOLATIONS SECTION ==========
         print("\n[ VIOLATIONS DETECTED ]")
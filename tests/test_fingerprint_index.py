@@ -0,0 +1,143 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from backend.src.service.fingerprint_index import FingerprintIndex
+
+
+FRAMES = ["ffff0000ffff0000"] * 9
+ENVELOPE = [10, 80, 40, 100, 20, 60, 30, 90]
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    path = tmp_path / "fingerprints.json"
+    monkeypatch.setenv("FINGERPRINT_INDEX_PATH", str(path))
+    monkeypatch.setenv("AUDIT_RULES_VERSION", "rules-v1")
+    for name in ["DUPLICATE_DETECTION_ENABLED", "DUPLICATE_MIRROR_REUSE"]:
+        monkeypatch.delenv(name, raising=False)
+    return path
+
+
+def fingerprint(source_id, title="Acme Energy Drink Official Ad", duration=30,
+                frame_hashes=FRAMES, audio_envelope=ENVELOPE):
+    return {
+        "source_id": source_id,
+        "title": FingerprintIndex.normalize_title(title),
+        "duration": duration,
+        "frame_hashes": frame_hashes,
+        "audio_envelope": audio_envelope,
+    }
+
+
+def test_hash_distance_is_mean_hamming_distance():
+    assert FingerprintIndex.hash_distance(["00", "00"], ["00", "00"]) == 0
+    assert FingerprintIndex.hash_distance(["00", "00"], ["03", "01"]) == 1.5
+
+
+def test_audio_distance_counts_missing_windows():
+    assert FingerprintIndex.audio_distance([10, 20], [10, 20]) == 0
+    assert FingerprintIndex.audio_distance([0, 0], [100, 100]) == 1
+    assert FingerprintIndex.audio_distance([10, 20], [10, 20, 30, 40]) == 0.5
+
+
+def test_same_source_id_matches(index_path):
+    index = FingerprintIndex()
+    assert index.is_match(fingerprint("A"), fingerprint("A", title="other", duration=6))
+
+
+def test_title_alone_never_matches(index_path):
+    index = FingerprintIndex()
+    a = fingerprint("A", title="Acme Energy Drink - Official Ad 30s (Version A)", frame_hashes=None, audio_envelope=None)
+    b = fingerprint("B", title="Acme Energy Drink - Official Ad 30s (Version B)", frame_hashes=None, audio_envelope=None)
+    assert not index.is_match(a, b)
+
+
+def test_mirror_needs_frames_and_audio(index_path):
+    index = FingerprintIndex()
+    original = fingerprint("A")
+    assert index.is_match(fingerprint("B"), original)
+    # same picture, new voice-over
+    assert not index.is_match(fingerprint("B", audio_envelope=[90, 10, 80, 5, 70, 0, 60, 5]), original)
+    # same sound, different picture
+    assert not index.is_match(fingerprint("B", frame_hashes=["0000ffff0000ffff"] * 9), original)
+    # no audio fingerprint
+    assert not index.is_match(fingerprint("B", audio_envelope=None), original)
+
+
+def test_candidates_need_close_duration_and_title(index_path):
+    index = FingerprintIndex()
+    original = fingerprint("A")
+    assert not index.is_match(fingerprint("B", duration=15), original)
+    assert not index.is_match(fingerprint("B", title="Totally unrelated cooking video"), original)
+
+
+def test_mirror_reuse_can_be_disabled(index_path, monkeypatch):
+    monkeypatch.setenv("DUPLICATE_MIRROR_REUSE", "false")
+    index = FingerprintIndex()
+    assert not index.is_match(fingerprint("B"), fingerprint("A"))
+    assert index.is_match(fingerprint("A"), fingerprint("A"))
+
+
+def test_add_and_find_newest_match(index_path):
+    FingerprintIndex().add(fingerprint("A"), {"video_id": "vid_old"})
+    FingerprintIndex().add(fingerprint("A"), {"video_id": "vid_new"})
+
+    assert FingerprintIndex().find_match(fingerprint("A"))["video_id"] == "vid_new"
+    assert len(json.loads(index_path.read_text())) == 2
+
+
+def test_add_keeps_records_written_by_another_process(index_path):
+    stale = FingerprintIndex()
+    FingerprintIndex().add(fingerprint("A"), {"video_id": "vid_a"})
+    stale.add(fingerprint("B"), {"video_id": "vid_b"})
+
+    ids = [record["audit"]["video_id"] for record in json.loads(index_path.read_text())]
+    assert ids == ["vid_a", "vid_b"]
+
+
+def test_other_rules_version_is_not_reused(index_path, monkeypatch):
+    FingerprintIndex().add(fingerprint("A"), {"video_id": "vid_a"})
+    monkeypatch.setenv("AUDIT_RULES_VERSION", "rules-v2")
+    assert FingerprintIndex().find_match(fingerprint("A")) is None
+
+
+def test_detection_can_be_disabled(index_path, monkeypatch):
+    FingerprintIndex().add(fingerprint("A"), {"video_id": "vid_a"})
+    monkeypatch.setenv("DUPLICATE_DETECTION_ENABLED", "false")
+    assert FingerprintIndex().find_match(fingerprint("A")) is None
+
+
+def test_corrupt_index_raises_and_is_not_overwritten(index_path):
+    index_path.write_text("[{")
+    with pytest.raises(Exception, match="corrupt"):
+        FingerprintIndex()
+    assert index_path.read_text() == "[{"
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_content_fingerprint_survives_reencode_but_not_new_audio(tmp_path):
+    def make_video(path, modulation, extra=()):
+        subprocess.run(
+            [
+                "ffmpeg", "-loglevel", "error", "-y",
+                "-f", "lavfi", "-i", "testsrc=duration=6:size=320x240:rate=25",
+                "-f", "lavfi", "-i", f"aevalsrc=sin(2*PI*440*t)*(0.5+0.5*sin(2*PI*{modulation}*t)):d=6",
+                *extra, "-shortest", str(path)
+            ],
+            check=True
+        )
+
+    original, mirror, voice_over = tmp_path / "a.mp4", tmp_path / "b.mp4", tmp_path / "c.mp4"
+    make_video(original, 0.7)
+    make_video(mirror, 0.7, ["-vf", "scale=256:192", "-b:a", "48k"])
+    make_video(voice_over, 1.3)
+
+    frames = {p: FingerprintIndex.frame_hashes(str(p), 6) for p in [original, mirror, voice_over]}
+    audio = {p: FingerprintIndex.audio_envelope(str(p)) for p in [original, mirror, voice_over]}
+
+    assert FingerprintIndex.hash_distance(frames[original], frames[mirror]) <= 4
+    assert FingerprintIndex.audio_distance(audio[original], audio[mirror]) <= 0.05
+    assert FingerprintIndex.audio_distance(audio[original], audio[voice_over]) > 0.05
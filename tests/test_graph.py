@@ -0,0 +1,248 @@
+import json
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_community")
+pytest.importorskip("yt_dlp")
+pytest.importorskip("azure.identity")
+
+from langgraph.graph import END
+
+from backend.src.graph import nodes, workflow
+
+
+class FakeDoc:
+    page_content = "Disclose material connections clearly."
+
+
+class FakeVectorStore:
+    def similarity_search(self, query, k=3):
+        return [FakeDoc()]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, payload):
+        self.payload = payload
+        self.messages = None
+
+    def invoke(self, messages):
+        self.messages = messages
+        return FakeResponse(json.dumps(self.payload))
+
+
+INDEXED = {
+    "video_id": "vid_1",
+    "transcript": "Best drink ever",
+    "ocr_text": ["#ad"],
+    "video_metadata": {"duration": 30, "platform": "youtube"},
+}
+
+
+def test_route_after_indexer_duplicate_goes_to_end():
+    assert workflow.route_after_indexer({**INDEXED, "duplicate_of": "vid_0"}) == END
+
+
+def test_route_after_indexer_failed_goes_to_finalizer():
+    state = {"transcript": "", "ocr_text": [], "errors": ["download failed"]}
+    assert workflow.route_after_indexer(state) == "finalizer"
+
+
+def test_route_after_indexer_fans_out():
+    assert workflow.route_after_indexer(INDEXED) == workflow.AUDIT_BRANCHES
+
+
+def test_finalize_skips_when_indexer_failed():
+    result = nodes.finalize_audit_node({"transcript": "", "ocr_text": [], "errors": ["boom"]})
+    assert result["final_status"] == "FAIL"
+    assert "Skipped" in result["final_report"]
+
+
+def test_finalize_passes_when_all_branches_pass():
+    state = {**INDEXED, "audit_statuses": ["PASS", "PASS", "PASS"], "audit_summaries": ["[Transcript] ok"]}
+    result = nodes.finalize_audit_node(state)
+    assert result["final_status"] == "PASS"
+    assert "[Transcript] ok" in result["final_report"]
+
+
+def test_finalize_fails_when_a_branch_fails_or_errors():
+    assert nodes.finalize_audit_node({**INDEXED, "audit_statuses": ["PASS", "FAIL"]})["final_status"] == "FAIL"
+    state = {**INDEXED, "audit_statuses": ["PASS"], "errors": ["OCR audit failed"]}
+    assert nodes.finalize_audit_node(state)["final_status"] == "FAIL"
+
+
+def test_finalize_fails_when_no_branch_ran():
+    assert nodes.finalize_audit_node(INDEXED)["final_status"] == "FAIL"
+
+
+def test_run_audit_normalises_status_and_passes_other_sources(monkeypatch):
+    llm = FakeLLM({"compliance_results": [], "status": "fail", "final_report": "x"})
+    monkeypatch.setattr(nodes, "_get_vector_store", lambda: FakeVectorStore())
+    monkeypatch.setattr(nodes, "_get_llm", lambda: llm)
+
+    result = nodes._run_audit("Transcript", INDEXED)
+
+    assert result["audit_statuses"] == ["FAIL"]
+    user_message = llm.messages[1].content
+    assert "Best drink ever" in user_message
+    assert "#ad" in user_message
+
+
+def test_run_audit_retrieval_failure_is_reported_as_error(monkeypatch):
+    def broken_store():
+        raise RuntimeError("search down")
+
+    monkeypatch.setattr(nodes, "_get_vector_store", broken_store)
+
+    result = nodes._run_audit("Transcript", INDEXED)
+
+    assert "search down" in result["errors"][0]
+    assert "audit_statuses" not in result
+
+
+def test_graph_merges_parallel_branches(monkeypatch):
+    monkeypatch.setattr(workflow, "index_video_node", lambda state: dict(INDEXED))
+    monkeypatch.setattr(workflow, "audit_transcript_node", lambda state: {
+        "compliance_results": [{"category": "Claim", "severity": "WARNING", "description": "d"}],
+        "audit_statuses": ["PASS"], "audit_summaries": ["[Transcript] ok"]
+    })
+    monkeypatch.setattr(workflow, "audit_ocr_node", lambda state: {
+        "audit_statuses": ["PASS"], "audit_summaries": ["[OCR] ok"]
+    })
+    monkeypatch.setattr(workflow, "audit_metadata_node", lambda state: {
+        "audit_statuses": ["PASS"], "audit_summaries": ["[Metadata] ok"]
+    })
+    monkeypatch.setattr(workflow, "record_fingerprint_node", lambda state: {})
+
+    final_state = workflow.create_graph().invoke({
+        "video_url": "https://youtu.be/x", "video_id": "vid_1",
+        "compliance_results": [], "audit_statuses": [], "audit_summaries": [], "errors": []
+    })
+
+    assert final_state["final_status"] == "PASS"
+    assert len(final_state["compliance_results"]) == 1
+    assert sorted(final_state["audit_summaries"]) == ["[Metadata] ok", "[OCR] ok", "[Transcript] ok"]
+
+
+def test_graph_failed_indexer_skips_branches(monkeypatch):
+    def branch_must_not_run(state):
+        raise AssertionError("audit branch ran after a failed indexing")
+
+    monkeypatch.setattr(workflow, "index_video_node", lambda state: {
+        "errors": ["download failed"], "final_status": "FAIL", "transcript": "", "ocr_text": []
+    })
+    for name in ["audit_transcript_node", "audit_ocr_node", "audit_metadata_node"]:
+        monkeypatch.setattr(workflow, name, branch_must_not_run)
+    monkeypatch.setattr(workflow, "record_fingerprint_node", lambda state: {})
+
+    final_state = workflow.create_graph().invoke({
+        "video_url": "https://youtu.be/x", "video_id": "vid_1",
+        "compliance_results": [], "audit_statuses": [], "audit_summaries": [], "errors": []
+    })
+
+    assert final_state["final_status"] == "FAIL"
+    assert "Skipped" in final_state["final_report"]
+
+
+class FakeVideoIndexerService:
+    uploads = []
+
+    def __init__(self, info, insights):
+        self.info = info
+        self.insights = insights
+
+    def get_youtube_metadata(self, url, output_path="temp_video.mp4"):
+        return self.info
+
+    def download_youtube_video(self, url, output_path="temp_video.mp4", info=None):
+        with open(output_path, "wb") as f:
+            f.write(b"video")
+        return output_path
+
+    def upload_video(self, video_path, video_name):
+        self.uploads.append(video_name)
+        return "azure_id"
+
+    def wait_for_processing(self, video_id):
+        return {}
+
+    def extract_data(self, vi_json):
+        return dict(self.insights)
+
+
+@pytest.fixture
+def fingerprint_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FINGERPRINT_INDEX_PATH", str(tmp_path / "fingerprints.json"))
+    monkeypatch.setenv("AUDIT_RULES_VERSION", "rules-v1")
+    monkeypatch.setattr(nodes.FingerprintIndex, "ffmpeg_available", classmethod(lambda cls: True))
+    monkeypatch.setattr(nodes.FingerprintIndex, "frame_hashes", staticmethod(lambda path, duration: ["ff00"] * 9))
+    FakeVideoIndexerService.uploads = []
+
+
+def stub_service(monkeypatch, source_id, envelope, insights=INDEXED):
+    info = {"id": source_id, "title": "Acme Official Ad", "duration": 30}
+    monkeypatch.setattr(nodes, "VideoIndexerService", lambda: FakeVideoIndexerService(info, insights))
+    monkeypatch.setattr(nodes.FingerprintIndex, "audio_envelope", staticmethod(lambda path: envelope))
+
+
+def recorded_audit(**overrides):
+    return {**INDEXED, "audit_statuses": ["PASS"], "final_status": "PASS", "final_report": "ok", **overrides}
+
+
+def test_mirror_reuses_audit_and_is_recorded_under_its_own_id(fingerprint_env, monkeypatch):
+    stub_service(monkeypatch, "v1", [10, 90, 30])
+    state = {"video_url": "https://youtu.be/v1", "video_id": "vid_1"}
+    indexed = nodes.index_video_node(state)
+    nodes.record_fingerprint_node(recorded_audit(**indexed))
+
+    stub_service(monkeypatch, "v2", [10, 90, 30])
+    result = nodes.index_video_node({"video_url": "https://youtu.be/v2", "video_id": "vid_2"})
+
+    assert result["duplicate_of"] == "vid_1"
+    assert result["final_status"] == "PASS"
+    assert FakeVideoIndexerService.uploads == ["vid_1"]
+    assert nodes.FingerprintIndex().find_match({"source_id": "v2"})["video_id"] == "vid_1"
+
+
+def test_new_voice_over_is_audited_again(fingerprint_env, monkeypatch):
+    stub_service(monkeypatch, "v1", [10, 90, 30])
+    indexed = nodes.index_video_node({"video_url": "https://youtu.be/v1", "video_id": "vid_1"})
+    nodes.record_fingerprint_node(recorded_audit(**indexed))
+
+    stub_service(monkeypatch, "v4", [90, 5, 80], insights={**INDEXED, "transcript": "bad claim"})
+    result = nodes.index_video_node({"video_url": "https://youtu.be/v4", "video_id": "vid_4"})
+
+    assert "duplicate_of" not in result
+    assert result["transcript"] == "bad claim"
+    assert FakeVideoIndexerService.uploads == ["vid_1", "vid_4"]
+
+
+def test_fingerprint_failure_falls_back_to_full_audit(fingerprint_env, monkeypatch):
+    monkeypatch.setenv("DUPLICATE_MAX_HASH_DISTANCE", "not a number")
+    stub_service(monkeypatch, "v1", [10, 90, 30])
+
+    result = nodes.index_video_node({"video_url": "https://youtu.be/v1", "video_id": "vid_1"})
+
+    assert "errors" not in result
+    assert result["transcript"] == INDEXED["transcript"]
+    assert FakeVideoIndexerService.uploads == ["vid_1"]
+
+
+def test_recorder_stores_speechless_ads(fingerprint_env):
+    fp = {"source_id": "v1", "title": "t", "duration": 30}
+    nodes.record_fingerprint_node(recorded_audit(fingerprint=fp, transcript=""))
+    assert nodes.FingerprintIndex().find_match(fp)["video_id"] == "vid_1"
+
+
+def test_recorder_skips_audits_that_did_not_run(fingerprint_env):
+    fp = {"source_id": "v1", "title": "t", "duration": 30}
+    nodes.record_fingerprint_node(recorded_audit(fingerprint=fp, audit_statuses=[]))
+    nodes.record_fingerprint_node(recorded_audit(fingerprint=fp, errors=["OCR audit failed"]))
+    assert nodes.FingerprintIndex().find_match(fp) is None